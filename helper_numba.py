@@ -0,0 +1,73 @@
+"""
+Numba-compiled crossing detection kernel.
+
+This module is imported lazily by helper.py; if numba is not installed,
+helper.py falls back to the pure NumPy implementation. The kernels are
+compiled with cache=True so the warm-up cost is paid only once per
+machine, not once per run.
+"""
+import numpy as np
+from numba import njit, prange
+
+
+@njit(inline="always")
+def _cross(ax, ay, bx, by, cx, cy):
+    """signed cross product of the triple (a, b, c); its sign is the orientation"""
+    return (by - ay) * (cx - bx) - (bx - ax) * (cy - by)
+
+
+@njit(inline="always")
+def _do_intersect_arr(px, py, qx, qy, pid, qid, xmin, xmax, ymin, ymax, i, j):
+    """flat-array version of helper.do_intersect for edges i and j"""
+    # cheap bounding-box cull before the cross products
+    if xmax[i] < xmin[j] or xmax[j] < xmin[i] or ymax[i] < ymin[j] or ymax[j] < ymin[i]:
+        return False
+
+    if pid[i] == pid[j] or pid[i] == qid[j] or qid[i] == pid[j] or qid[i] == qid[j]:
+        return False
+
+    c1 = _cross(px[i], py[i], qx[i], qy[i], px[j], py[j])
+    c2 = _cross(px[i], py[i], qx[i], qy[i], qx[j], qy[j])
+    c3 = _cross(px[j], py[j], qx[j], qy[j], px[i], py[i])
+    c4 = _cross(px[j], py[j], qx[j], qy[j], qx[i], qy[i])
+
+    # opposite nonzero signs; collinear cases excluded by general position
+    return c1 * c2 < 0 and c3 * c4 < 0
+
+
+@njit(cache=True, parallel=True)
+def compute_crossings(px, py, qx, qy, pid, qid):
+    """
+    Compute all crossing pairs (i, j) with i < j.
+    Two passes: count crossings per row, then fill the pair arrays at
+    precomputed offsets, so both passes can run in parallel over i.
+    """
+    n_edges = px.shape[0]
+
+    xmin = np.minimum(px, qx)
+    xmax = np.maximum(px, qx)
+    ymin = np.minimum(py, qy)
+    ymax = np.maximum(py, qy)
+
+    row_counts = np.zeros(n_edges, dtype=np.int64)
+    for i in prange(n_edges):
+        c = 0
+        for j in range(i + 1, n_edges):
+            if _do_intersect_arr(px, py, qx, qy, pid, qid, xmin, xmax, ymin, ymax, i, j):
+                c += 1
+        row_counts[i] = c
+
+    offsets = np.zeros(n_edges + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(row_counts)
+
+    pairs_i = np.empty(offsets[-1], dtype=np.int64)
+    pairs_j = np.empty(offsets[-1], dtype=np.int64)
+    for i in prange(n_edges):
+        pos = offsets[i]
+        for j in range(i + 1, n_edges):
+            if _do_intersect_arr(px, py, qx, qy, pid, qid, xmin, xmax, ymin, ymax, i, j):
+                pairs_i[pos] = i
+                pairs_j[pos] = j
+                pos += 1
+
+    return pairs_i, pairs_j
@@ -26,6 +26,11 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 SOFTWARE.
 """
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+import os
+import random
+
+import gurobipy as grb
 
 from helper import str2bool
 from solver import Solver_ILP
@@ -83,17 +88,47 @@ def main():
 
 
 def random_experiment_pst(args):
-
-    for _ in range(args.n_iterations):
-        ilp_solver = Solver_ILP(args)
-        ilp_solver.compute_solution()
+    run_parallel_experiment(args)
 
 
 def random_experiment_subgraphs(args):
+    run_parallel_experiment(args)
+
+
+# per-process gurobi environment, created once per worker by the
+# executor initializer (environments cannot be shared across processes)
+_worker_env = None
+
+
+def _init_worker_env():
+    """create this worker's gurobi environment, reused for all its solves"""
+    global _worker_env
+    # restrict each solve to one gurobi thread to avoid oversubscribing
+    # the cores across concurrent workers
+    _worker_env = grb.Env(params={"Threads": 1})
 
-    for _ in range(args.n_iterations):
-        ilp_solver = Solver_ILP(args)
-        ilp_solver.compute_solution()
+
+def run_parallel_experiment(args):
+    """
+    Run args.n_iterations independent solves, dispatched across cores.
+    The iterations share nothing, so they parallelize trivially.
+    """
+    base_seed = random.randrange(2**32)
+    seeds = [base_seed + i for i in range(args.n_iterations)]
+
+    with ProcessPoolExecutor(max_workers=os.cpu_count(), initializer=_init_worker_env) as executor:
+        list(executor.map(one_experiment_run, [args] * args.n_iterations, seeds))
+
+
+def one_experiment_run(args, seed):
+    """run a single experiment iteration in its worker process"""
+    if _worker_env is None:
+        _init_worker_env()
+
+    random.seed(seed)
+    ilp_solver = Solver_ILP(args, env=_worker_env)
+    ilp_solver.compute_solution()
+    return ilp_solver.meta_data
 
 
 def parse_input():
@@ -118,6 +153,7 @@ def parse_input():
     parser.add_argument("--n1_constraints", type=str2bool, default=True, help="constraint: n-1 edges.")
     parser.add_argument("--forbidden_cycles", type=int, nargs="*", default=[], help="forbidden cycles, can be empty.")
     parser.add_argument("--cover_all_vertices", type=str2bool, default=False, help="constraint: all vertices reached.")
+    parser.add_argument("--symmetry_breaking", type=str2bool, default=True, help="break color symmetry in the ILP.")
     parser.add_argument("--timelimit", type=int, default=None, help="timelimit for ILP in seconds (86400 sec = 1 day)")
 
     # k-planar partitions
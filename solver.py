@@ -1,18 +1,19 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-import itertools
 import json
 import os
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import List, Tuple
 
 import gurobipy as grb
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
 from matplotlib.backends.backend_pdf import PdfPages
 import networkx as nx
+import numpy as np
 
-from helper import do_intersect, generate_all_cycles, get_input, in_general_position
+from classes import Geometry
+from helper import generate_all_cycles, get_input, in_general_position
 
 NX_OPTIONS_NORMAL = {
     "node_color": "black",
@@ -47,6 +48,8 @@ class SolverBase(ABC):
         self.points, self.edges = get_input(args)
         assert(in_general_position(self.points))
 
+        self.geom = Geometry.from_graph(self.points, self.edges)
+
         self.n = len(self.points)
         self.k = self.n // 2 if args.n_colors < 0 else args.n_colors
         self.colorclasses_nx = []
@@ -77,11 +80,24 @@ class SolverBase(ABC):
             pre_path = self.prepare_directory(self.args.res_dir)  # default is 'results'
             pp = PdfPages(pre_path + "_multipage.pdf")
 
-        plt.figure()
+        # positions are shared by all figures below, so build them once
+        pos = {p.id: (p.x, p.y) for p in self.points}
+
+        # combined figure: one graph holding all classes, drawn in a single
+        # pass with a per-edge color list instead of one draw per class.
+        # the edgelist is passed explicitly because G_all.edges() iterates
+        # in adjacency order, which would misalign edges and colors
+        G_all = nx.Graph()
+        G_all.add_nodes_from(pos)
+        all_edges = []
+        edge_colors = []
         for i, G in enumerate(self.colorclasses_nx):
-            nx.draw_networkx(
-                G, pos={v: G.nodes[v]["pos"] for v in G.nodes}, edge_color=ALL_COLORS[i], **self.nx_options
-            )
+            G_all.add_edges_from(G.edges)
+            all_edges.extend(G.edges)
+            edge_colors.extend([ALL_COLORS[i]] * len(G.edges))
+
+        plt.figure()
+        nx.draw_networkx(G_all, pos=pos, edgelist=all_edges, edge_color=edge_colors, **self.nx_options)
         if self.args.save_data:
             plt.savefig(pp, format="pdf")
         if self.args.plot:
@@ -89,12 +105,10 @@ class SolverBase(ABC):
 
         for i, G in enumerate(self.colorclasses_nx):
             plt.figure()
-            nx.draw_networkx(
-                G, pos={v: G.nodes[v]["pos"] for v in G.nodes}, edge_color=ALL_COLORS[i], **self.nx_options
-            )
+            nx.draw_networkx(G, pos=pos, edge_color=ALL_COLORS[i], **self.nx_options)
             if self.args.draw_labels:
                 nx.draw_networkx_edge_labels(
-                    G, pos={v: G.nodes[v]["pos"] for v in G.nodes}, edge_labels={e: i for i, e in enumerate(G.edges)}
+                    G, pos=pos, edge_labels={e: i for i, e in enumerate(G.edges)}
                 )
             if self.args.save_data:
                 plt.savefig(pp, format="pdf")
@@ -185,14 +199,14 @@ class SolverBase(ABC):
 
     def convert_edge_colors_to_nx(self) -> None:
 
-        for e in self.edges:
-            assert e.color is not None
+        assert np.all(self.geom.color >= 0)
 
         for c in range(self.k):
             G = nx.Graph()
             G.add_nodes_from((p.id, {"pos": (p.x, p.y)}) for p in self.points)
 
-            G.add_edges_from([(e.p.id, e.q.id) for e in self.edges if e.color == c])
+            ids = np.flatnonzero(self.geom.color == c)
+            G.add_edges_from(zip(self.geom.ep[ids].tolist(), self.geom.eq[ids].tolist()))
 
             self.colorclasses_nx.append(G)
 
@@ -213,8 +227,11 @@ class SolverBase(ABC):
 
 
 class Solver_ILP(SolverBase):
-    def __init__(self, args) -> None:
+    def __init__(self, args, env=None) -> None:
         super().__init__(args)
+        # optional shared gurobi environment; avoids paying environment
+        # startup per solve when running many iterations
+        self.env = env
 
     def compute_solution(self) -> None:
 
@@ -252,16 +269,19 @@ class Solver_ILP(SolverBase):
 
     def _ilp_model_to_edge_color_assignment(self) -> None:
         """assign results from ILP model to edge colors"""
-        for v, colors in self.x_vars.items():
-            for c, var in colors.items():
-                if var.X == 1:
-                    self.edges[v].color = c
+        colors = np.argmax(self.x_vars.X, axis=1)
+        self.geom.color[:] = colors
+        for e, c in zip(self.edges, colors.tolist()):
+            e.color = c
 
-    def _graph_to_ilp_model(self) -> Tuple[grb.Model, Dict]:
+    def _graph_to_ilp_model(self) -> Tuple[grb.Model, grb.MVar]:
         """
         Convert graph (given by self.edges) to ILP model.
+        Constraints are pushed in matrix form (addMVar/addConstr) so that
+        each block crosses the C/Python boundary once instead of once per
+        variable or constraint.
         Returns:
-            ILP model, ILP variables
+            ILP model, ILP variables as an (E, k) binary MVar
         """
 
         edges = self.edges
@@ -269,98 +289,90 @@ class Solver_ILP(SolverBase):
         n = self.n
         n_edges = len(self.edges)
 
-        model = grb.Model(name="graph partitioning")
+        if self.env is not None:
+            model = grb.Model(name="graph partitioning", env=self.env)
+        else:
+            model = grb.Model(name="graph partitioning")
 
-        # create lookup dictionary
-        edge_tuple_to_id = dict()
-        for e in edges:
-            edge_tuple_to_id[(e.p.id, e.q.id)] = e.id
-            edge_tuple_to_id[(e.q.id, e.p.id)] = e.id
+        # dense endpoint-pair -> edge id lookup (-1 for non-edges)
+        edge_id = np.full((n, n), -1, dtype=np.int32)
+        edge_id[self.geom.ep, self.geom.eq] = np.arange(n_edges, dtype=np.int32)
+        edge_id[self.geom.eq, self.geom.ep] = np.arange(n_edges, dtype=np.int32)
 
         # define model variables as
-        # x_{e}_{c} such that x_e_c = 1 <==> edge e receives color c
-        x_vars = {
-            e: {c: model.addVar(vtype=grb.GRB.BINARY, name="x_{}_{}".format(e, c)) for c in range(k)}
-            for e in range(n_edges)
-        }
+        # x[e, c] such that x[e, c] = 1 <==> edge e receives color c
+        x = model.addMVar((n_edges, k), vtype=grb.GRB.BINARY, name="x")
 
         # CONSTRAINT 1 (mandatory): each edge receives exactly one color
-        for e in range(n_edges):
-            model.addLConstr(
-                lhs=grb.quicksum(x_vars[e][c] for c in range(k)),
-                sense=grb.GRB.EQUAL,
-                rhs=1,
-                name=f"constr_{e}",
-            )
+        model.addConstr(x.sum(axis=1) == 1, name="one_color")
+
+        # SYMMETRY BREAKING (optional): the colors are interchangeable, so
+        # every feasible partition appears k! times in the search tree.
+        # With fixed class sizes, fix the first edge to color 0; otherwise
+        # order the classes by size. (Combining both would be unsound: the
+        # class of edge 0 need not be the largest one.)
+        if self.args.symmetry_breaking and n_edges > 0:
+            if self.args.n1_constraints:
+                model.addConstr(x[0, 0] == 1, name="sym_first_edge")
+            else:
+                class_sizes = x.sum(axis=0)
+                for c in range(k - 1):
+                    model.addConstr(class_sizes[c] >= class_sizes[c + 1], name=f"sym_order_{c}")
+            # let gurobi's own symmetry detection run aggressively as well
+            model.Params.Symmetry = 2
 
         # CONSTRAINT 2 (mandatory): intersecting edges get different colors
         if self.args.k_planar <= 0:  # plane partition
-            for e1, e2 in itertools.combinations(edges, 2):
-                if not do_intersect(e1, e2):
-                    continue
-                for c in range(k):
-                    model.addLConstr(
-                        lhs=grb.quicksum((x_vars[e1.id][c], x_vars[e2.id][c])),
-                        sense=grb.GRB.LESS_EQUAL,
-                        rhs=1,
-                        name=f"neighbor_constr_{e1.id}:{e2.id}_{c}",
-                    )
+            # crossings were already computed by set_crossings, so gather
+            # the crossing pairs instead of re-testing all C(E,2) pairs
+            i_parts = []
+            j_parts = []
+            for e in edges:
+                higher = e.crossed_edges[e.crossed_edges > e.id]
+                if len(higher) > 0:
+                    i_parts.append(np.full(len(higher), e.id, dtype=np.int32))
+                    j_parts.append(higher)
+            if len(i_parts) > 0:
+                i_idx = np.concatenate(i_parts)
+                j_idx = np.concatenate(j_parts)
+                model.addConstr(x[i_idx, :] + x[j_idx, :] <= 1, name="neighbor")
         else:  # k-plane partition
-            for c in range(k):
-                for e in edges:
-                    model.addLConstr(
-                        lhs=grb.quicksum(x_vars[e1.id][c] for e1 in e.crossed_edges),
-                        sense=grb.GRB.LESS_EQUAL,
-                        rhs=(self.args.k_planar + (1 - x_vars[e.id][c]) * len(edges)),
-                        name=f"neighbor_constr_{e.id}_{c}",
-                    )
+            for e in edges:
+                crossed_ids = self.geom.crossed[e.id]
+                model.addConstr(
+                    x[crossed_ids, :].sum(axis=0) <= self.args.k_planar + (1 - x[e.id, :]) * len(edges),
+                    name=f"neighbor_{e.id}",
+                )
 
         # CONSTRAINT 3 (optional): each color class has exactly n-1 edges
         if self.args.n1_constraints:
-            for c in range(k):
-                model.addLConstr(
-                    lhs=grb.quicksum(x_vars[e][c] for e in range(n_edges)),
-                    sense=grb.GRB.EQUAL,
-                    rhs=n - 1,
-                    name=f"constr_{c}",
-                )
+            model.addConstr(x.sum(axis=0) == n - 1, name="n1")
 
         # CONSTRAINT 4 (optional): forbid cycles of certain lengths
         forbidden_lengths = self.args.forbidden_cycles  # only 3 and 4 possible at the moment
-        all_cycles: List[Tuple[int, ...]] = generate_all_cycles(n, forbidden_lengths)
-
-        for cycle in all_cycles:
-            # get edge ids of the edges involved in the cycle
-            edge_ids = []
-            for i in range(len(cycle)):
-                s = cycle[i]
-                t = cycle[(i + 1) % len(cycle)]
-                edge_ids.append(edge_tuple_to_id[(s, t)])
-
-            # cycle must not be monochromatic
-            for color in range(k):
-                model.addLConstr(
-                    lhs=grb.quicksum([x_vars[i][color] for i in edge_ids]),
-                    sense=grb.GRB.LESS_EQUAL,
-                    rhs=len(cycle) - 1,
-                    name=f"{len(cycle)}_cycle_constr_{cycle}_color_{c}",
-                )
+        cycle_groups: List[np.ndarray] = generate_all_cycles(n, forbidden_lengths)
+
+        for cycles in cycle_groups:
+            if len(cycles) == 0:
+                continue
+            length = cycles.shape[1]
+            # translate all cycles to edge ids at once via fancy indexing
+            cycle_edge_ids = edge_id[cycles, np.roll(cycles, -1, axis=1)]
+            # no cycle must be monochromatic
+            model.addConstr(x[cycle_edge_ids, :].sum(axis=1) <= length - 1, name=f"{length}_cycle")
 
         # CONSTRAINT 5 (optional): every vertex is incident to at least one edge of each color
         if self.args.cover_all_vertices:
-            for c in range(k):
-                for v in range(n):
-                    incident_edge_ids = [e.id for e in edges if e.p.id == v or e.q.id == v]
-                    model.addLConstr(
-                        lhs=grb.quicksum(x_vars[e][c] for e in incident_edge_ids),
-                        sense=grb.GRB.GREATER_EQUAL,
-                        rhs=1,
-                        name=f"constr_{c}",
-                    )
-
-        objective = grb.quicksum(x_vars[e][c] for e in range(n_edges) for c in range(k))
+            # vertex -> incident edge ids, built once and reused for every color
+            incident = [[] for _ in range(n)]
+            for e, (s, t) in enumerate(zip(self.geom.ep.tolist(), self.geom.eq.tolist())):
+                incident[s].append(e)
+                incident[t].append(e)
+
+            for v in range(n):
+                model.addConstr(x[incident[v], :].sum(axis=0) >= 1, name=f"cover_{v}")
 
         model.ModelSense = grb.GRB.MINIMIZE
-        model.setObjective(objective)
+        model.setObjective(x.sum())
 
-        return model, x_vars
+        return model, x